@@ -0,0 +1,13 @@
+"""Process-wide I2C bus singleton.
+
+Constructing busio.I2C probes pins and opens the bus device, so every
+module doing its own setup re-pays that cost on import and ends up with
+a private bus object it can't share. Import the bus from here instead;
+it is built exactly once per process.
+"""
+
+import board
+import busio
+
+# VL53L0X (and the MPU breakout) support 400 kHz Fast-mode
+I2C_PRIMARY = busio.I2C(board.SCL, board.SDA, frequency=400000)
@@ -1,18 +1,25 @@
 import serial
 import pynmea2
 
+# One streaming reader per session: pynmea2 buffers partial reads across
+# calls and dispatches sentence types via cheap prefix lookup instead of
+# re-entering the generic parse() path for every line.
+_stream = pynmea2.NMEAStreamReader(errors='ignore')
+
 def setup(port="/dev/serial0", baudrate=9600):
     return serial.Serial(port, baudrate=baudrate, timeout=1)
 
 def get_gps_data(gps_serial):
     try:
-        gps_data = gps_serial.readline().decode('ascii', errors='replace')
-        if gps_data.startswith("$GPGGA") or gps_data.startswith("$GPRMC"):
-            msg = pynmea2.parse(gps_data)
-            return {
-                "latitude": msg.latitude,
-                "longitude": msg.longitude
-            }
+        chunk = gps_serial.read(gps_serial.in_waiting or 1)
+        if not chunk:
+            return None
+        for msg in _stream.next(chunk.decode('ascii', errors='replace')):
+            if isinstance(msg, (pynmea2.GGA, pynmea2.RMC)):
+                return {
+                    "latitude": msg.latitude,
+                    "longitude": msg.longitude
+                }
     except Exception:
         pass
     return None
@@ -0,0 +1,89 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Optional C extension for the GPRMC hot path.
+
+Build in place with:
+
+    pip install cython
+    cythonize -i _gps_nmea.pyx
+
+gps_utils falls back to its pure-Python parser when this module is not
+compiled, so building it is never required - it just removes bytecode
+dispatch and boxed-float churn from the per-sentence parse.
+"""
+
+from libc.math cimport NAN, isnan
+
+DEF KNOTS_TO_KMH = 1.852
+
+# Arithmetic against a bytes literal would need Python-object coercion,
+# which is illegal under nogil; comparisons get the single-char coercion
+# but the subtraction needs a plain C constant.
+cdef unsigned char ZERO = b'0'
+
+
+cdef double parse_coord(const unsigned char[:] coord, unsigned char direction) nogil:
+    """Parse DDMM.MMMM / DDDMM.MMMM into decimal degrees; NAN on error."""
+    cdef Py_ssize_t n = coord.shape[0]
+    cdef Py_ssize_t dot = -1
+    cdef Py_ssize_t i
+    cdef long degrees = 0
+    cdef long min_int = 0
+    cdef long frac = 0
+    cdef double scale = 1.0
+    cdef unsigned char c
+    cdef double decimal
+
+    for i in range(n):
+        if coord[i] == b'.':
+            dot = i
+            break
+    if dot < 2 or dot > n - 1:
+        return NAN
+
+    for i in range(dot - 2):
+        c = coord[i]
+        if c < b'0' or c > b'9':
+            return NAN
+        degrees = degrees * 10 + (c - ZERO)
+
+    for i in range(dot - 2, dot):
+        c = coord[i]
+        if c < b'0' or c > b'9':
+            return NAN
+        min_int = min_int * 10 + (c - ZERO)
+
+    for i in range(dot + 1, n):
+        c = coord[i]
+        if c < b'0' or c > b'9':
+            return NAN
+        frac = frac * 10 + (c - ZERO)
+        scale *= 10.0
+
+    decimal = degrees + (min_int + frac / scale) / 60.0
+    if direction == b'S' or direction == b'W':
+        return -decimal
+    return decimal
+
+
+cpdef parse_rmc(bytes raw):
+    """Parse a raw $GPRMC sentence into (lat, lon, speed_kmh), or None."""
+    cdef double lat, lon
+
+    parts = raw.rstrip(b"\r\n").split(b",", 9)
+    if len(parts) < 10 or parts[2] != b'A':
+        return None
+
+    lat_raw = parts[3]
+    lat_dir = parts[4]
+    lon_raw = parts[5]
+    lon_dir = parts[6]
+    if not lat_raw or not lat_dir or not lon_raw or not lon_dir:
+        return None
+
+    lat = parse_coord(lat_raw, lat_dir[0])
+    lon = parse_coord(lon_raw, lon_dir[0])
+    if isnan(lat) or isnan(lon):
+        return None
+
+    speed_knots = parts[7]
+    return (lat, lon, float(speed_knots or b"0") * KNOTS_TO_KMH)
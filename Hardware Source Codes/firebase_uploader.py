@@ -1,3 +1,4 @@
+import json
 import time
 import os
 import requests
@@ -125,6 +126,96 @@ def update_rider_mpu(
         return False
 
 
+def multi_patch(payload: Dict[str, dict]) -> bool:
+    """Apply a multi-path update in one PATCH against the database root.
+
+    Keys are slash paths relative to the root ("users/<uid>/mpu/<ts>"),
+    so heterogeneous updates - MPU and speed samples alike - coalesce
+    into a single HTTPS round-trip instead of one per node.
+    """
+    if not payload:
+        return True
+    url = f"{DB_URL}/.json?auth={_current_auth_token()}"
+    try:
+        response = requests.patch(url, json=payload, timeout=10)
+        return response.status_code == 200
+    except Exception as e:
+        print(f"Firebase multi-path patch exception: {e}")
+        return False
+
+
+def update_rider_batch(
+    user_id: str,
+    mpu_fields=None,
+    speed: Optional[float] = None,
+    speed_limit: Optional[float] = None,
+    warnings: Optional[Dict[str, dict]] = None,
+    timestamp_ms: Optional[int] = None
+) -> bool:
+    """Push MPU, speed, and warnings to rider_data in one PATCH.
+
+    Coalesces what used to be separate update_rider_mpu and
+    update_rider_speed round-trips into a single multi-path request, so
+    one TLS exchange covers the whole push and the dashboard never sees
+    speed without its matching MPU frame. Omitted pieces are skipped.
+    """
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    base = f"users/{user_id}/rider_data"
+    payload = {}
+    if mpu_fields is not None:
+        acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z = mpu_fields
+        payload[f"{base}/mpu"] = {
+            "acc_x": acc_x,
+            "acc_y": acc_y,
+            "acc_z": acc_z,
+            "gyro_x": gyro_x,
+            "gyro_y": gyro_y,
+            "gyro_z": gyro_z,
+            "timestamp": timestamp_ms
+        }
+    if speed is not None:
+        payload[f"{base}/speed"] = speed
+    if speed_limit is not None:
+        payload[f"{base}/speed_limit"] = speed_limit
+    if warnings:
+        payload[f"{base}/active_warnings"] = warnings
+    return multi_patch(payload)
+
+
+def update_rider_mpu_batch(user_id: str, samples: list) -> bool:
+    """Push many MPU samples in one multi-path PATCH.
+
+    Each sample is (acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z, timestamp_ms).
+    Firebase applies the whole payload in a single request, so N samples
+    cost one HTTPS/TLS round-trip instead of N.
+    """
+    payload = {}
+    for acc_x, acc_y, acc_z, gyro_x, gyro_y, gyro_z, timestamp_ms in samples:
+        payload[f"users/{user_id}/mpu/{timestamp_ms}"] = {
+            "acc_x": acc_x,
+            "acc_y": acc_y,
+            "acc_z": acc_z,
+            "gyro_x": gyro_x,
+            "gyro_y": gyro_y,
+            "gyro_z": gyro_z,
+            "timestamp": timestamp_ms
+        }
+    return multi_patch(payload)
+
+
+def update_rider_speed_batch(user_id: str, samples: list) -> bool:
+    """Push many (speed, speed_limit, timestamp_ms) samples in one PATCH."""
+    payload = {}
+    for speed, speed_limit, timestamp_ms in samples:
+        payload[f"users/{user_id}/speed/{timestamp_ms}"] = {
+            "speed": speed,
+            "speed_limit": speed_limit,
+            "timestamp": timestamp_ms
+        }
+    return multi_patch(payload)
+
+
 def init_auth():
     _sign_in_email_password()
 
@@ -170,6 +261,45 @@ def get_control_flags_for_ride(user_id: str, ride_id: Optional[str]) -> tuple[bo
     return False, False
 
 
+def stream_control_flags(user_id: str, ride_id: Optional[str] = None):
+    """Yield control-flag dicts from a Realtime DB server-sent-event stream.
+
+    The REST API serves text/event-stream for GETs with that Accept
+    header: the connection then blocks until the node changes, so waiting
+    for activation costs zero polling round-trips. Yields the node's
+    current value on every put/patch, and None on the server's ~30 s
+    keep-alive heartbeats so long-lived subscribers can re-check
+    lifecycle conditions (stop flags, ride changes) between real events;
+    raises on disconnect so callers can fall back to polling.
+    """
+    if ride_id:
+        path = f"users/{user_id}/rides/{ride_id}/ride_control"
+    else:
+        path = f"users/{user_id}/rider_control"
+    url = f"{DB_URL}/{path}.json?auth={_current_auth_token()}"
+    # Finite read timeout: the server heartbeats every ~30 s, so 90 s of
+    # silence means the TCP connection died without a close (cellular
+    # handover) - let the timeout raise and drive the polling fallback
+    # instead of blocking iter_lines forever.
+    with requests.get(url, headers={"Accept": "text/event-stream"},
+                      stream=True, timeout=(8, 90)) as resp:
+        resp.raise_for_status()
+        event = None
+        for raw in resp.iter_lines():
+            if not raw:
+                continue
+            line = raw.decode('utf-8')
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                if event in ("put", "patch"):
+                    payload = json.loads(line[5:].strip() or "null") or {}
+                    data = payload.get("data")
+                    yield data if isinstance(data, dict) else {}
+                elif event == "keep-alive":
+                    yield None
+
+
 def get_next_ride_id(user_id: str) -> str:
     """Return the next integer ride id as a string.
 
@@ -1,63 +1,89 @@
 import serial
 import csv
+import mmap
 import time
+from collections import deque
 from datetime import datetime
-import subprocess
 import os
 
+from gps_utils import KNOTS_TO_KMH, enable_gps_port, _parse_lat_lon as parse_lat_lon
+
 # Replace with your serial port (usually /dev/serial0 or /dev/ttyAMA0)
 GPS_PORT = "/dev/serial0"
 GPS_BAUD = 9600
 
+# Per-fix terminal output floods the console (and stalls the read loop on
+# slow terminals) under poor-signal bursts. Keep it off by default and
+# rate-limit to one line per second when enabled.
+VERBOSE = False
+PRINT_INTERVAL_S = 1.0
+
+# Flushing every few rows is an extra write() syscall without any durability
+# gain (no fsync, so a crash still loses the page cache). Instead let stdio
+# buffer the rows and do a real flush + fsync on a coarse interval.
+FSYNC_INTERVAL_S = 30.0
+
 # Output CSV file
 csv_file = f"data/gps_{datetime.now().strftime('%m%d_%H%M%S')}.csv"
 
 # Ensure data folder exists
 os.makedirs("data", exist_ok=True)
 
-# Conversion constants
-KNOTS_TO_KMH = 1.852
-
-def enable_gps_port():
-    """Enable GPS port with proper permissions"""
-    try:
-        subprocess.run(['sudo', 'chmod', '666', '/dev/ttyS0'], check=True)
-        print("✅ GPS port permissions enabled")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to enable GPS port: {e}")
-        return False
-
 def check_port_exists():
     """Check if GPS port exists and is accessible"""
     return os.path.exists('/dev/ttyS0')
 
-def parse_lat_lon(coord_str, direction):
-    """Convert GPS coordinate from DDMM.MMMM format to decimal degrees"""
-    if not coord_str or not direction:
-        return None
-    
-    try:
-        # DDMM.MMMM format - first 2 or 3 digits are degrees, rest are minutes
-        if len(coord_str) >= 7:  # Minimum: DD MM.MMM
-            if coord_str.find('.') > 4:  # Longitude: DDDMM.MMMM
-                degrees = int(coord_str[:3])
-                minutes = float(coord_str[3:])
-            else:  # Latitude: DDMM.MMMM
-                degrees = int(coord_str[:2])
-                minutes = float(coord_str[2:])
-            
-            decimal_deg = degrees + minutes / 60.0
-            
-            # Apply direction
-            if direction in ['S', 'W']:
-                decimal_deg = -decimal_deg
-            
-            return round(decimal_deg, 6)  # 6 decimal places for good precision
-    except (ValueError, IndexError):
-        pass
-    
-    return None
+# Pre-extend the CSV file by this much and grow in doubling steps
+CSV_MMAP_INITIAL_SIZE = 16 << 20  # 16 MB
+
+class MmapCsvFile:
+    """Append-only CSV target backed by a pre-extended mmap.
+
+    Rows are copied straight into the mapped page cache instead of going
+    through a write() syscall each; the file is truncated back to the bytes
+    actually written on close. Exposes write/flush/fileno so it can stand
+    in for a regular file under csv.writer.
+    """
+
+    def __init__(self, path, size=CSV_MMAP_INITIAL_SIZE):
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self.fd, size)
+        self.size = size
+        self.mm = mmap.mmap(self.fd, size)
+        self.write_off = 0
+
+    def write(self, data):
+        encoded = data.encode('ascii', errors='replace')
+        end = self.write_off + len(encoded)
+        if end > self.size:
+            self._grow(max(self.size * 2, end))
+        self.mm[self.write_off:end] = encoded
+        self.write_off = end
+        return len(data)
+
+    def _grow(self, new_size):
+        self.mm.close()
+        os.ftruncate(self.fd, new_size)
+        self.size = new_size
+        self.mm = mmap.mmap(self.fd, new_size)
+
+    def flush(self):
+        self.mm.flush()
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        os.ftruncate(self.fd, self.write_off)
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 print(f"Starting GPS logger with coordinate conversion...")
 print(f"Port: {GPS_PORT}")
@@ -70,7 +96,7 @@ try:
     if not enable_gps_port():
         raise Exception("Cannot enable GPS port")
     
-    with serial.Serial(GPS_PORT, GPS_BAUD, timeout=1) as ser, open(csv_file, "w", newline="") as f:
+    with serial.Serial(GPS_PORT, GPS_BAUD, timeout=1) as ser, MmapCsvFile(csv_file) as f:
         writer = csv.writer(f)
         # Updated headers with decimal coordinates and km/h speed
         writer.writerow(["UTC Time", "Latitude_DD", "Longitude_DD", "Speed_KMH", "Course_Deg", "Date", "Valid", "Raw_Data"])
@@ -85,6 +111,11 @@ try:
         start_time = time.time()
         port_retry_count = 0
         max_port_retries = 5
+        last_print = 0.0
+        last_fsync = start_time
+        # Keep the most recent raw sentences in memory for postmortem instead
+        # of printing each one as it arrives
+        recent_sentences = deque(maxlen=20)
 
         try:
             while True:
@@ -94,11 +125,8 @@ try:
                     
                     if line:
                         sentence_count += 1
-                        
-                        # Print all NMEA sentences for debugging (optional)
-                        if sentence_count <= 20:  # Show first 20 sentences
-                            print(f"[{sentence_count:3d}] {line}")
-                        
+                        recent_sentences.append(line)
+
                         if line.startswith("$GPRMC"):
                             gprmc_count += 1
                             parts = line.split(",")
@@ -131,14 +159,17 @@ try:
                                 if valid == 'A':
                                     valid_count += 1
 
-                                # Print to terminal with converted values
-                                status_symbol = "✅" if valid == 'A' else "❌"
-                                elapsed = time.time() - start_time
-                                
-                                lat_str = f"{latitude_dd:.6f}" if latitude_dd is not None else "N/A"
-                                lon_str = f"{longitude_dd:.6f}" if longitude_dd is not None else "N/A"
-                                
-                                print(f"{status_symbol} [{gprmc_count:3d}] {utc_time} Lat:{lat_str} Lon:{lon_str} Speed:{speed_kmh:.2f}km/h Course:{course}° Valid:{valid} ({elapsed:.1f}s)")
+                                # Print to terminal with converted values (rate-limited)
+                                now = time.time()
+                                if VERBOSE and now - last_print > PRINT_INTERVAL_S:
+                                    status_symbol = "✅" if valid == 'A' else "❌"
+                                    elapsed = now - start_time
+
+                                    lat_str = f"{latitude_dd:.6f}" if latitude_dd is not None else "N/A"
+                                    lon_str = f"{longitude_dd:.6f}" if longitude_dd is not None else "N/A"
+
+                                    print(f"{status_symbol} [{gprmc_count:3d}] {utc_time} Lat:{lat_str} Lon:{lon_str} Speed:{speed_kmh:.2f}km/h Course:{course}° Valid:{valid} ({elapsed:.1f}s)")
+                                    last_print = now
 
                                 # Save to CSV with converted values
                                 writer.writerow([
@@ -152,9 +183,11 @@ try:
                                     line
                                 ])
                                 
-                                # Flush every 10 valid readings
-                                if valid_count % 10 == 0:
+                                # Periodic flush + fsync for durability
+                                if now - last_fsync > FSYNC_INTERVAL_S:
                                     f.flush()
+                                    os.fsync(f.fileno())
+                                    last_fsync = now
                             else:
                                 print(f"⚠️  Incomplete GPRMC sentence: {line}")
                 
@@ -204,6 +237,11 @@ try:
             print(f"  Success rate: {(valid_count/gprmc_count*100):.1f}%" if gprmc_count > 0 else "  Success rate: 0%")
             print(f"  Output file: {csv_file}")
             
+            if recent_sentences:
+                print(f"\nLast {len(recent_sentences)} raw sentences:")
+                for sentence in recent_sentences:
+                    print(f"  {sentence}")
+
             if valid_count == 0:
                 print(f"\n⚠️  WARNING: No valid GPS fixes received!")
                 print("Possible issues:")
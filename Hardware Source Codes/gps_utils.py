@@ -5,29 +5,197 @@ parsing the $GPRMC NMEA sentence to extract latitude, longitude, and speed.
 """
 
 import serial
+import select
+import struct
 import time
-import subprocess
+import logging
 import os
+from functools import lru_cache
+from typing import Final
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Non-Linux fallback; low-latency tuning is skipped
+    fcntl = None
+    termios = None
+
+try:
+    # Optional compiled RMC parser (see _gps_nmea.pyx); pure Python below
+    # remains the fallback when the extension isn't built
+    import _gps_nmea
+except ImportError:
+    _gps_nmea = None
 
 # Configuration
 GPS_PORT = "/dev/serial0"
 GPS_BAUD = 9600
+GPS_READ_TIMEOUT = 0.1  # Blocking readline timeout (seconds)
 KNOTS_TO_KMH = 1.852
 
+# serial_struct ioctls (see linux/serial.h)
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 1 << 13
+# Must cover sizeof(struct serial_struct) on both 32- and 64-bit kernels
+# (60 vs 72 bytes - iomem_base/iomap_base widen); a short buffer would
+# hand TIOCSSERIAL truncated garbage in the pointer-bearing tail.
+_SERIAL_STRUCT_SIZE = 128
+_SERIAL_FLAGS_OFFSET = 16  # int type, line, port, irq precede flags
+
 # Debug flag - set to True for verbose output
-DEBUG_GPS = True
+DEBUG_GPS: Final[bool] = False
+
+# Debug output goes through logging so argument formatting is deferred:
+# when the DEBUG level is disabled, logger.debug() bails out at C speed
+# before touching its format arguments
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG if DEBUG_GPS else logging.INFO)
+
+# Hemisphere sign lookup - avoids building a list and branching per call
+_SIGN = {b'N': 1.0, b'S': -1.0, b'E': 1.0, b'W': -1.0}
+
+# Scale factors for the fractional-minutes field, indexed by digit count
+_POW10 = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+# Set once the port permissions have been fixed up, so retry loops don't
+# re-chmod on every attempt
+_port_enabled = False
+_perm_warning_shown = False
 
 
 def enable_gps_port():
-    """Enable GPS port with proper permissions"""
+    """Enable GPS port with proper permissions.
+
+    Uses a direct os.chmod instead of forking `sudo chmod` (a ~10 ms
+    fork+exec+PAM round trip that used to run inside the retry loop). If we
+    lack the privilege, point the user at a udev rule once and move on.
+    """
+    global _port_enabled, _perm_warning_shown
+    if _port_enabled:
+        return True
     try:
-        subprocess.run(['sudo', 'chmod', '666', '/dev/ttyS0'], check=True)
-        if DEBUG_GPS:
-            print("✅ GPS port permissions enabled")
+        os.chmod('/dev/ttyS0', 0o666)
+        _port_enabled = True
+        logger.debug("GPS port permissions enabled")
         return True
-    except subprocess.CalledProcessError as e:
-        if DEBUG_GPS:
+    except (PermissionError, FileNotFoundError) as e:
+        if not _perm_warning_shown:
+            _perm_warning_shown = True
             print(f"❌ Failed to enable GPS port: {e}")
+            print('   Install a udev rule instead: KERNEL=="ttyS0", MODE="0666"')
+            print("   (or add this user to the dialout group)")
+        return False
+
+
+# Candidate ports to probe when the configured port is missing
+_CANDIDATE_PORTS = [GPS_PORT, '/dev/ttyS0', '/dev/ttyAMA0']
+
+# Memoized result of the last successful probe so reconnect cycles don't
+# re-stat every candidate port
+_DETECTED_PORT = None
+
+
+def find_gps_port(preferred=GPS_PORT):
+    """Return the first existing GPS serial port, caching the result.
+
+    Probes the preferred port, the fixed candidates, then any USB serial
+    adapters. Repeated calls (e.g. during reconnection) reuse the cached
+    port as long as it still exists.
+    """
+    global _DETECTED_PORT
+
+    if _DETECTED_PORT and os.path.exists(_DETECTED_PORT):
+        return _DETECTED_PORT
+
+    # One readdir pass over /dev instead of a stat per candidate plus globs
+    wanted = {os.path.basename(p) for p in [preferred] + _CANDIDATE_PORTS}
+    prefixes = ('ttyUSB', 'ttyACM')
+    found = set()
+    usb_ports = []
+    try:
+        for entry in os.scandir('/dev'):
+            name = entry.name
+            if name in wanted:
+                found.add(name)
+            elif name.startswith(prefixes):
+                usb_ports.append(entry.path)
+    except OSError:
+        return None
+
+    candidates = [preferred] + [p for p in _CANDIDATE_PORTS if p != preferred]
+    for port in candidates:
+        if os.path.basename(port) in found:
+            _DETECTED_PORT = port
+            return port
+
+    # Fall back to USB serial adapters
+    if usb_ports:
+        _DETECTED_PORT = sorted(usb_ports)[0]
+        return _DETECTED_PORT
+
+    return None
+
+
+def _set_low_latency(gps_serial):
+    """Ask the serial driver to deliver bytes immediately (best effort).
+
+    Sets ASYNC_LOW_LATENCY on the fd, which drops USB-serial adapter
+    buffering from ~16 ms to ~1 ms. Also tries the sysfs latency_timer knob
+    for FTDI adapters. Harmless no-op on ports that don't support it.
+    """
+    try:
+        # Preferred: pyserial's helper round-trips a full-size
+        # serial_struct buffer, so nothing truncated ever goes back to
+        # the kernel via TIOCSSERIAL.
+        gps_serial.set_low_latency_mode(True)
+    except (AttributeError, ValueError, OSError, IOError):
+        # Older pyserial or unsupported platform - raw ioctl fallback.
+        # The buffer must span the whole struct (see _SERIAL_STRUCT_SIZE)
+        # so TIOCSSERIAL writes back exactly what TIOCGSERIAL returned,
+        # flags aside.
+        if fcntl is None:
+            return False
+        try:
+            fd = gps_serial.fileno()
+            buf = bytearray(fcntl.ioctl(fd, TIOCGSERIAL, bytes(_SERIAL_STRUCT_SIZE)))
+            flags = struct.unpack_from('i', buf, _SERIAL_FLAGS_OFFSET)[0]
+            struct.pack_into('i', buf, _SERIAL_FLAGS_OFFSET, flags | ASYNC_LOW_LATENCY)
+            fcntl.ioctl(fd, TIOCSSERIAL, buf)
+        except (OSError, IOError):
+            return False
+
+    # FTDI-style adapters also expose a sysfs latency timer (ms)
+    try:
+        tty = os.path.basename(os.path.realpath(gps_serial.port))
+        latency_path = f"/sys/bus/usb-serial/devices/{tty}/latency_timer"
+        if os.path.exists(latency_path):
+            with open(latency_path, 'w') as f:
+                f.write('1')
+    except (OSError, IOError):
+        pass
+    return True
+
+
+def _set_raw_immediate(gps_serial):
+    """Configure the tty so reads return whatever bytes are available.
+
+    Raw mode with VMIN=0, VTIME=1 tells the kernel to hand back available
+    bytes after at most one decisecond instead of holding them in the tty
+    inactivity timer. Best effort; no-op where termios is unavailable.
+    """
+    if termios is None:
+        return False
+    try:
+        fd = gps_serial.fileno()
+        attrs = termios.tcgetattr(fd)
+        attrs[3] &= ~(termios.ICANON | termios.ECHO)
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 1
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        return True
+    except (OSError, termios.error):
         return False
 
 
@@ -35,13 +203,22 @@ def init_gps_with_recovery(port=GPS_PORT, baud=GPS_BAUD, max_retries=10):
     """Initialize GPS with automatic port recovery"""
     for attempt in range(max_retries):
         try:
+            # Fall back to probing if the configured port is missing
+            detected = find_gps_port(port)
+            if detected and detected != port:
+                logger.debug("Using detected GPS port %s instead of %s", detected, port)
+                port = detected
+
             # Enable port permissions before attempting connection
             if not enable_gps_port():
                 print(f"⚠️ Could not enable port permissions (attempt {attempt + 1}/{max_retries})")
             
-            gps_serial = serial.Serial(port, baud, timeout=1)
-            if DEBUG_GPS:
-                print(f"✅ GPS serial connection established on {port}")
+            gps_serial = serial.Serial(port, baud, timeout=GPS_READ_TIMEOUT)
+            _set_low_latency(gps_serial)
+            _set_raw_immediate(gps_serial)
+            # Drop memoized coordinates from before a GPS reset
+            _parse_lat_lon.cache_clear()
+            logger.debug("GPS serial connection established on %s", port)
             
             # Give GPS module time to initialize
             time.sleep(2)
@@ -58,79 +235,161 @@ def init_gps_with_recovery(port=GPS_PORT, baud=GPS_BAUD, max_retries=10):
     return None
 
 
+@lru_cache(maxsize=256)
 def _parse_lat_lon(coord_str, direction):
     """
-    Parses a NMEA coordinate string (DDMM.MMMM or DDDMM.MMMM) into decimal degrees.
+    Parses a NMEA coordinate (DDMM.MMMM or DDDMM.MMMM) into decimal degrees.
+    Accepts bytes (the hot path stays in the byte domain) or str.
+
+    Memoized: on a stationary or slow vehicle consecutive RMC sentences
+    repeat the same coordinate strings, so the parse is skipped entirely.
+    Callers must pass hashable arguments (bytes or str, not bytearray).
     """
     if not coord_str or not direction:
         return None
 
     try:
-        coord_float = float(coord_str)
-        
-        # For latitude: DDMM.MMMM (degrees in first 2 digits)
-        # For longitude: DDDMM.MMMM (degrees in first 3 digits)
-        if direction in ['N', 'S']:  # Latitude
-            degrees = int(coord_float // 100)
-            minutes = coord_float - (degrees * 100)
-        else:  # Longitude (E, W)
-            degrees = int(coord_float // 100)
-            minutes = coord_float - (degrees * 100)
-
-        # Calculate decimal degrees
-        decimal_degrees = degrees + (minutes / 60.0)
-
-        # Apply direction (S or W are negative)
-        if direction in ['S', 'W']:
-            decimal_degrees *= -1
-
-        return decimal_degrees
-    except (ValueError, IndexError) as e:
-        if DEBUG_GPS:
-            print(f"Error parsing coordinate '{coord_str}' '{direction}': {e}")
+        if isinstance(coord_str, str):
+            coord_str = coord_str.encode('ascii')
+        if isinstance(direction, str):
+            direction = direction.encode('ascii')
+
+        # The field layout is fixed ASCII (DDMM.MMMM for latitude,
+        # DDDMM.MMMM for longitude - the distinction is encoded by the
+        # string length), so pull degrees and minutes out with int() on the
+        # digit substrings and pay a single floating-point divide.
+        dot = coord_str.index(b'.')
+        degrees = int(coord_str[:dot - 2])
+        min_int = int(coord_str[dot - 2:dot])
+        frac = coord_str[dot + 1:]
+        nfrac = len(frac)
+        scale = _POW10[nfrac] if nfrac < len(_POW10) else 10.0 ** nfrac
+        decimal_degrees = degrees + (min_int + int(frac) / scale) / 60.0
+
+        # Apply direction via lookup (S and W are negative); bytes() also
+        # normalizes bytearray slices coming from the drain buffer
+        return _SIGN.get(bytes(direction), 1.0) * decimal_degrees
+    except (ValueError, IndexError):
+        # No debug print here: the function must stay pure (and cheap) for
+        # the lru_cache to be sound
         return None
 
 
-def get_gps_data_with_recovery(gps_serial, retry_count=0, max_retries=3):
-    """Enhanced GPS data reading with automatic port recovery"""
-    try:
-        if gps_serial.in_waiting == 0:
-            return (None, None, None)
-        
-        lines_read = 0
-        max_lines = 5
-        
-        while lines_read < max_lines and gps_serial.in_waiting > 0:
-            line = gps_serial.readline().decode("ascii", errors="ignore").strip()
-            lines_read += 1
-            
-            if line.startswith("$GPRMC"):
-                parts = line.split(",")
-                if len(parts) >= 10:
-                    status = parts[2]
-                    lat_raw = parts[3]
-                    lat_dir = parts[4]
-                    lon_raw = parts[5]
-                    lon_dir = parts[6]
-                    speed_knots = parts[7]
-                    
-                    if status == 'A' and lat_raw and lon_raw and lat_dir and lon_dir:
-                        latitude = _parse_lat_lon(lat_raw, lat_dir)
-                        longitude = _parse_lat_lon(lon_raw, lon_dir)
-                        speed_kmh = float(speed_knots) * KNOTS_TO_KMH if speed_knots else 0.0
-
-                        if latitude is not None and longitude is not None:
-                            return (latitude, longitude, speed_kmh)
-        
+def nmea_xor(buf):
+    """XOR checksum of a sentence payload, folding 8 bytes per step (SWAR).
+
+    A per-byte Python loop costs roughly a microsecond per byte; packing 8
+    lanes into one int XOR cuts the iteration count ~8x. The accumulator's
+    lane bytes are collapsed at the end, plus any tail shorter than 8.
+    """
+    acc = 0
+    n = len(buf) - (len(buf) % 8)
+    for i in range(0, n, 8):
+        acc ^= int.from_bytes(buf[i:i + 8], 'little')
+    result = 0
+    while acc:
+        result ^= acc & 0xFF
+        acc >>= 8
+    for b in buf[n:]:
+        result ^= b
+    return result
+
+
+# Carry-over buffer for a sentence split across two serial reads
+_gps_tail = bytearray()
+
+# Fixed read buffer reused for every serial read: os.readv fills it in
+# place, so no fresh bytes object is allocated per pass
+_READ_BUF = bytearray(4096)
+_READ_VIEW = memoryview(_READ_BUF)
+
+
+def _read_gps_once(gps_serial):
+    """Single read pass: drain the serial buffer and parse any RMC fix.
+
+    Drains whatever the driver has buffered with a single select() plus one
+    os.read() on the raw fd - two syscalls per pass, no pyserial wrapper in
+    between - and splits into sentences here. An incomplete trailing
+    sentence is kept in _gps_tail for the next call.
+    """
+    fd = gps_serial.fileno()
+    readable, _, _ = select.select([fd], [], [], GPS_READ_TIMEOUT)
+    nread = 0
+    if readable:
+        try:
+            nread = os.readv(fd, [_READ_BUF])
+        except BlockingIOError:
+            nread = 0
+    if not nread and not _gps_tail:
         return (None, None, None)
+    _gps_tail.extend(_READ_VIEW[:nread])
+    lines = _gps_tail.split(b"\n")
+    del _gps_tail[:]
+    _gps_tail.extend(lines[-1])
+
+    for raw in lines[:-1]:
+        # Most sentences (GGA/GSA/GSV/VTG/...) get discarded, so test the
+        # prefix on the raw bytes and only pay decode+strip for RMC lines.
+        if raw.startswith(b"$GPRMC"):
+            # Validate the *XX checksum (XOR of the payload between $ and *)
+            star = raw.rfind(b"*")
+            if star != -1:
+                try:
+                    expected = int(raw[star + 1:star + 3], 16)
+                except ValueError:
+                    continue
+                if nmea_xor(raw[1:star]) != expected:
+                    continue
+
+            if _gps_nmea is not None:
+                fix = _gps_nmea.parse_rmc(bytes(raw))
+                if fix is not None:
+                    return fix
+                continue
+
+            # Bounded split: only the first 10 fields are consumed, so stop
+            # splitting there and skip allocating course/date/magvar/checksum
+            parts = raw.rstrip(b"\r").split(b",", 9)
+            if len(parts) >= 10:
+                status = parts[2]
+                lat_raw = parts[3]
+                lat_dir = parts[4]
+                lon_raw = parts[5]
+                lon_dir = parts[6]
+                speed_knots = parts[7]
+
+                if status == b'A' and lat_raw and lon_raw and lat_dir and lon_dir:
+                    # bytes() makes the bytearray slices hashable cache keys
+                    latitude = _parse_lat_lon(bytes(lat_raw), bytes(lat_dir))
+                    longitude = _parse_lat_lon(bytes(lon_raw), bytes(lon_dir))
+                    # Single expression; the b"0" default removes the
+                    # per-fix branch on an empty speed field
+                    speed_kmh = float(speed_knots or b"0") * KNOTS_TO_KMH
+
+                    if latitude is not None and longitude is not None:
+                        return (latitude, longitude, speed_kmh)
+
+    return (None, None, None)
+
+
+def get_gps_data_with_recovery(gps_serial, retry_count=0, max_retries=3):
+    """Enhanced GPS data reading with iterative port recovery.
+
+    Reconnection retries run in a flat loop rather than recursing, so a
+    cascade of serial errors can't grow the call stack or obscure the
+    original failure.
+    """
+    for attempt in range(retry_count, max_retries + 1):
+        try:
+            return _read_gps_once(gps_serial)
+
+        except (serial.SerialException, OSError) as e:
+            logger.debug("GPS serial error: %s", e)
+
+            if attempt >= max_retries:
+                break
+            print(f"🔄 Attempting GPS recovery (attempt {attempt + 1}/{max_retries})")
 
-    except (serial.SerialException, OSError) as e:
-        if DEBUG_GPS:
-            print(f"⚠️ GPS serial error: {e}")
-        
-        if retry_count < max_retries:
-            print(f"🔄 Attempting GPS recovery (attempt {retry_count + 1}/{max_retries})")
-            
             # Try to re-enable port and reconnect
             if enable_gps_port():
                 try:
@@ -138,20 +397,36 @@ def get_gps_data_with_recovery(gps_serial, retry_count=0, max_retries=3):
                     time.sleep(1)
                     gps_serial.open()
                     print("✅ GPS port reconnected successfully")
-                    
-                    # Recursive call with incremented retry count
-                    return get_gps_data_with_recovery(gps_serial, retry_count + 1, max_retries)
-                    
                 except Exception as reconnect_error:
-                    if DEBUG_GPS:
-                        print(f"❌ GPS reconnection failed: {reconnect_error}")
-            
-        return (None, None, None)
-    
-    except Exception as e:
-        if DEBUG_GPS:
-            print(f"GPS read error: {e}")
-        return (None, None, None)
+                    logger.debug("GPS reconnection failed: %s", reconnect_error)
+                    break
+
+        except Exception as e:
+            logger.debug("GPS read error: %s", e)
+            break
+
+    return (None, None, None)
+
+
+def gps_stream(gps_serial):
+    """Generator yielding one (lat, lon, speed_kmh) tuple per read pass.
+
+    Yields (None, None, None) when a pass produced no valid fix, so a 1 Hz
+    consumer can keep its existing fallback logic. Compared with calling
+    get_gps_data in a loop, the generator keeps its frame and locals alive
+    between fixes; errors drop into the recovery path.
+    """
+    while True:
+        try:
+            yield _read_gps_once(gps_serial)
+        except (serial.SerialException, OSError):
+            yield get_gps_data_with_recovery(gps_serial)
+        except Exception:
+            yield (None, None, None)
+
+
+# Cached per-port streams backing the legacy get_gps_data interface
+_stream_cache = {}
 
 
 def init_gps(port=GPS_PORT, baud=GPS_BAUD):
@@ -160,8 +435,23 @@ def init_gps(port=GPS_PORT, baud=GPS_BAUD):
 
 
 def get_gps_data(gps_serial):
-    """Legacy function - now uses recovery version"""
-    return get_gps_data_with_recovery(gps_serial)
+    """Legacy function - pulls one fix from a cached gps_stream"""
+    stream = _stream_cache.get(gps_serial)
+    if stream is None:
+        stream = _stream_cache[gps_serial] = gps_stream(gps_serial)
+    return next(stream)
+
+
+def poll(gps_serial):
+    """Nonblocking pull: a fresh (lat, lon, speed_kmh) fix, or None.
+
+    Unlike a blocking readline this returns as soon as the buffered bytes
+    are consumed (the only wait is the short select readiness window), so
+    callers can invoke it on every loop pass without holding anything up
+    and treat None as "no complete sentence yet".
+    """
+    fix = get_gps_data(gps_serial)
+    return None if fix == (None, None, None) else fix
 
 
 def test_gps_connection(port=GPS_PORT, baud=GPS_BAUD, duration=30):
@@ -175,20 +465,35 @@ def test_gps_connection(port=GPS_PORT, baud=GPS_BAUD, duration=30):
     print("-" * 60)
     
     try:
-        with serial.Serial(port, baud, timeout=1) as gps_serial:
-            start_time = time.time()
+        # Short timeout plus a 10 ms poll() wait keeps the duration countdown
+        # accurate: an idle port costs 10 ms per loop, not a 1 s readline stall
+        with serial.Serial(port, baud, timeout=0.01) as gps_serial:
+            poller = select.poll()
+            poller.register(gps_serial.fileno(), select.POLLIN)
+
+            # Hoist attribute lookups out of the loop: LOAD_FAST on a local
+            # beats re-walking the descriptor chain every iteration
+            poll = poller.poll
+            readline = gps_serial.readline
+            now = time.time
+
+            start_time = now()
             sentence_count = 0
             gprmc_count = 0
             valid_fixes = 0
-            
-            while (time.time() - start_time) < duration:
+
+            while (now() - start_time) < duration:
                 try:
-                    line = gps_serial.readline().decode("ascii", errors="ignore").strip()
-                    if line:
+                    if not poll(10):
+                        continue
+                    raw = readline()
+                    if raw:
                         sentence_count += 1
+                        line = raw.rstrip(b"\r\n").decode("ascii", errors="ignore")
                         print(f"[{sentence_count:3d}] {line}")
-                        
-                        if line.startswith("$GPRMC"):
+
+                        # Prefix test stays on the raw bytes
+                        if raw.startswith(b"$GPRMC"):
                             gprmc_count += 1
                             parts = line.split(",")
                             if len(parts) >= 3 and parts[2] == 'A':
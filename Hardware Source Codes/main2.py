@@ -1,18 +1,29 @@
+import selectors
+import sys
 import time
-import csv
+import array
+import bisect
+import ctypes
+import gc
 import os
+import struct
 import threading
-import glob
 import numpy as np
-from collections import deque
+from collections import OrderedDict, deque
 from datetime import datetime
-from queue import Queue, Empty
 import mpu_utils  # type: ignore
 import gps_utils  # type: ignore
 import speed_limit_utils  # type: ignore
 import firebase_uploader  # type: ignore
 import shared_memory_bridge  # type: ignore
 
+# Optional: kernel directory notifications for the image cache. Without
+# it the cache falls back to 1 Hz full rescans.
+try:
+    from inotify_simple import INotify, flags as _inotify_flags  # type: ignore
+except ImportError:
+    INotify = None
+
 TARGET_HZ = 104
 SAMPLE_INTERVAL = 1.0 / TARGET_HZ
 OLA_MAPS_API_KEY = "50c25aHLICdWQ4JbXp2MZwgmliGxvqJ8os1MOYe3"
@@ -28,33 +39,50 @@ IMAGE_DIR = "captured_images/"
 CSV_FILENAME = "sensor_data.csv"
 
 # Queues for async I/O
-csv_write_queue = Queue(maxsize=2000)  # Buffer up to 2000 samples
-print_queue = Queue(maxsize=100)  # For console output
-control_poll_queue = Queue(maxsize=1)  # For control flag updates
+# Single-producer/single-consumer paths use deques: append/popleft are
+# GIL-atomic, so there is no mutex+condvar handshake per sample the way
+# queue.Queue has. maxlen bounds memory by shedding the oldest entries.
+CSV_QUEUE_MAX = 2000
+csv_write_queue = deque(maxlen=CSV_QUEUE_MAX)  # Buffer up to 2000 samples
+csv_drop_count = 0  # Samples dropped because the CSV queue was full
+print_queue = deque(maxlen=100)  # For console output
 # Note: Firebase push logic moved to Warning_Generate.py
 
-data_lock = threading.Lock()
+# Cross-thread "latest value" slots are published as whole tuples: a
+# single global rebind is atomic under the GIL, so readers get coherent
+# snapshots without any lock. Fields that must stay consistent with each
+# other (lat/lon/speed/source/update time) live in one tuple.
 latest_mpu = (None, None, None, None, None, None)
-latest_gps = (None, None, None)
+latest_gps = (None, None, None, "UNKNOWN", 0.0)  # lat, lon, speed, source, updated_at (monotonic)
 latest_speed_limit = None
 last_speed_limit_fetch = 0.0
 stop_event = threading.Event()
 last_control_poll = 0.0
 current_is_active = False  # Only remaining control flag
-latest_speed_source = "UNKNOWN"  # Track whether speed from GPS or ACCEL fallback
-last_accel_decimals = 3  # Track decimal precision of last acceleration reading
+current_ride_id = ""  # Active ride id; written by main(), read by control poll
 
-# Image cache
-image_files_cache = []
+# Image cache: sorted timestamp array plus a parallel path list, swapped
+# wholesale under the lock so lookups can bisect instead of scanning
+image_ts_cache = array.array('q')
+image_path_cache = []
 image_cache_lock = threading.Lock()
 last_image_cache_update = 0.0
 
 # Speed calculation state
-last_accel_ms2 = 0.0  # Store latest acceleration in m/s^2
+# SoA ring of recent integrator outputs (m/s), written at the MPU rate.
+# The GPS fallback takes a vectorized mean over a window of these instead
+# of re-sampling the integrator in a second-long sleep loop.
+SPEED_RING_N = 256
+_speed_ring = np.zeros(SPEED_RING_N, dtype=np.float64)
+_speed_ring_head = 0
+# Latest x-axis acceleration (m/s^2). A single array.array('d') element
+# store/load is GIL-atomic, so the sensor thread publishes and the
+# integrator reads without sharing speed_calculation_lock for it; the
+# lock now only guards the integrator's read-modify-write state below.
+_accel_slot = array.array('d', [0.0])
 last_speed_calc_ts = None  # High-resolution time anchor (perf_counter)
 current_speed_ms = 0.0  # Current speed in m/s
 speed_calculation_lock = threading.Lock()
-gps_last_update_time = 0.0  # Track when GPS was last successfully updated
 GPS_TIMEOUT_SECONDS = 5.0  # Consider GPS stale after 5 seconds without update
 
 # Calibrated parameters from calibration analysis (calibrate_accel_to_speed.py)
@@ -62,11 +90,63 @@ OPTIMAL_BIAS = 0.117588  # g - systematic accelerometer bias
 DEADBAND_G = 0.02  # g - suppress noise below this threshold
 G_TO_MS2 = 9.81  # m/s² - gravity constant for conversion
 
+# eventfd wakeup per deque: producers signal after an append that makes
+# the queue non-empty, consumers block on a read instead of sleep-polling,
+# so idle workers cost zero wakeups (Linux-only; sleeps remain as fallback)
+try:
+    _csv_efd = os.eventfd(0)
+    _print_efd = os.eventfd(0)
+except AttributeError:
+    _csv_efd = _print_efd = None
+
 # Shared memory for warning system communication
 shm_writer = None
 batch_buffer = []  # Accumulate 104 points before writing to shared memory
 batch_buffer_lock = threading.Lock()
 
+def set_thread_affinity(cpu, rt_priority=None):
+    """Best-effort pinning of the calling thread, optionally SCHED_FIFO.
+
+    Pinning keeps the kernel from migrating the sampling threads across
+    cores mid-ride; SCHED_FIFO lifts the main loop above ordinary tasks
+    so wakeups are not delayed by background load. The real-time part
+    needs CAP_SYS_NICE (or root); without it the default policy stays.
+    """
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except (AttributeError, OSError) as e:
+        print(f"CPU pinning unavailable ({e})")
+        return
+    if rt_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(rt_priority))
+        except (AttributeError, OSError, PermissionError):
+            print("SCHED_FIFO not granted (needs CAP_SYS_NICE); staying SCHED_OTHER")
+
+def make_periodic_fd(hz):
+    """Kernel periodic timer fd for loop pacing, or None if unavailable.
+
+    Reading 8 bytes blocks until the next tick and returns how many ticks
+    elapsed, so pacing jitter is kernel-timer jitter rather than
+    time.sleep() scheduler jitter, and overruns are reported as a tick
+    count instead of silently stretching the cadence.
+    """
+    interval_ns = int(round(1e9 / hz))
+    sec, ns = divmod(interval_ns, 1_000_000_000)
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.timerfd_create(time.CLOCK_MONOTONIC, 0)
+        if fd < 0:
+            return None
+        # struct itimerspec: it_interval then it_value (timespec pairs)
+        spec = struct.pack('qqqq', sec, ns, sec, ns)
+        if libc.timerfd_settime(fd, 0, spec, None) != 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
 def calculate_speed_from_accel():
     """Integrate x-axis acceleration to estimate forward speed (m/s).
     Uses calibrated bias correction and deadband filtering based on real-world data.
@@ -79,7 +159,7 @@ def calculate_speed_from_accel():
     
     Returns current speed estimate in m/s.
     """
-    global current_speed_ms, last_accel_ms2, last_speed_calc_ts, last_accel_decimals
+    global current_speed_ms, last_speed_calc_ts
     with speed_calculation_lock:
         now = time.perf_counter()
         # Initialize anchor on first call
@@ -90,8 +170,8 @@ def calculate_speed_from_accel():
         dt = max(0.0, now - last_speed_calc_ts)
         last_speed_calc_ts = now  # Update anchor
 
-        # Convert m/s² back to g for bias correction
-        accel_g = last_accel_ms2 / G_TO_MS2
+        # Convert m/s² back to g for bias correction (atomic slot load)
+        accel_g = _accel_slot[0] / G_TO_MS2
         
         # Apply calibrated bias correction
         accel_corrected_g = accel_g - OPTIMAL_BIAS
@@ -119,48 +199,92 @@ def calculate_speed_from_accel():
 
         return current_speed_ms
 
+# The MPU's INT pin is not wired on this build, so the sensor thread
+# paces on a kernel timer at the sensor's real output rate instead of a
+# free-running 1 kHz sleep loop (1000 wakeups/s for ~200 Hz of data)
+MPU_RATE_HZ = 200
+
 def mpu_thread():
-    global latest_mpu, last_accel_ms2, last_accel_decimals
-    while not stop_event.is_set():
-        data = mpu_utils.get_mpu_data()
-        with data_lock:
-            latest_mpu = data
-        # Update latest acceleration and precision directly (no buffer)
+    global latest_mpu, _speed_ring_head
+    set_thread_affinity(2)  # Own core, away from the main loop on CPU 3
+    pacer = make_periodic_fd(MPU_RATE_HZ)
+    # Local bindings for the 200 Hz loop (LOAD_FAST vs global+attr walk)
+    _stop = stop_event.is_set
+    _read_mpu = mpu_utils.get_mpu_data
+    _step = calculate_speed_from_accel
+    _os_read = os.read
+    while not _stop():
+        data = _read_mpu()
+        # Single-reference rebind is atomic under the GIL; no lock needed
+        # on the writer side for a lone global.
+        latest_mpu = data
+        # Update latest acceleration directly (no buffer)
         updated_accel = False
         if data and len(data) >= 1 and data[0] is not None:
-            with speed_calculation_lock:
-                acc_x = data[0]
-                # Convert from g to m/s^2 if MPU returns g-units
-                last_accel_ms2 = acc_x * 9.81
-                raw_str = f"{acc_x:.10f}".rstrip('0').rstrip('.')
-                if '.' in raw_str:
-                    decs = len(raw_str.split('.')[1])
-                    if decs > 0:
-                        last_accel_decimals = min(decs, 10)
+            # Convert from g to m/s^2 if MPU returns g-units; the slot
+            # store is atomic, so no lock on the publish side either
+            _accel_slot[0] = data[0] * 9.81
             updated_accel = True
 
-        # Integrate at sensor rate for smoother fallback speed
+        # Integrate at sensor rate for smoother fallback speed, keeping
+        # the ring of recent outputs for windowed averaging
         if updated_accel:
-            calculate_speed_from_accel()
-
-        time.sleep(0.001)
+            _speed_ring[_speed_ring_head % SPEED_RING_N] = _step()
+            _speed_ring_head += 1
+
+        if pacer is not None:
+            _os_read(pacer, 8)  # Block until the next sensor period
+        else:
+            time.sleep(1.0 / MPU_RATE_HZ)
+
+def _fallback_speed_kmh(window):
+    """Mean of the last `window` integrator outputs, in km/h (vectorized)."""
+    n = min(window, _speed_ring_head, SPEED_RING_N)
+    if n == 0:
+        return calculate_speed_from_accel() * 3.6
+    head = _speed_ring_head % SPEED_RING_N
+    if n <= head:
+        mean = float(_speed_ring[head - n:head].mean())
+    else:
+        wrap = n - head
+        mean = float((_speed_ring[:head].sum() + _speed_ring[SPEED_RING_N - wrap:].sum()) / n)
+    return mean * 3.6
 
 def gps_thread(gps_serial):
     """GPS thread - reads GPS data and handles speed fallback before updating global variable.
     Uses calibrated accelerometer integration when GPS speed is unavailable, invalid, or zero.
     """
-    global latest_gps, gps_last_update_time, latest_speed_source
+    global latest_gps
     
     print("GPS thread started...")
-    
+
     # Number of samples for averaging fallback speed
     FALLBACK_SAMPLES = 104  # One batch worth of samples
 
+    # Wait on the serial fd instead of a fixed 1 s sleep: the thread
+    # wakes when NMEA bytes arrive, so a fresh fix is published at line
+    # rate rather than up to a second late. At 9600 baud a 1 Hz burst
+    # trickles in over a few hundred ms, so many wakeups land before a
+    # sentence completes - those passes must leave the last fix alone.
+    sel = None
+    sel_fd = -1
+    try:
+        sel = selectors.DefaultSelector()
+        sel_fd = gps_serial.fileno()
+        sel.register(sel_fd, selectors.EVENT_READ)
+    except Exception:
+        sel = None  # Fall back to fixed-cadence sleeps
+
     while not stop_event.is_set():
+        # One clock read shared by every branch; monotonic, so staleness
+        # checks against updated_at survive NTP/wall-clock jumps
+        now_mono = time.monotonic()
         try:
-            gps_data = gps_utils.get_gps_data(gps_serial)
-            
-            if gps_data and gps_data != (None, None, None):
+            # Nonblocking poll: returns None when no complete sentence is
+            # buffered instead of stalling the thread on a readline
+            gps_data = gps_utils.poll(gps_serial)
+
+            if gps_data:
                 lat, lon, gps_speed = gps_data
                 
                 # Check if GPS speed is valid (must be non-zero and within realistic range)
@@ -176,224 +300,302 @@ def gps_thread(gps_serial):
                     except Exception:
                         pass
                 elif gps_speed is not None and abs(gps_speed) < 0.5:
-                    # GPS reports zero or near-zero speed - use fallback calculation
-                    # This handles cases where GPS is available but reports 0 (stationary or GPS error)
-                    speed_samples = []
-                    for _ in range(FALLBACK_SAMPLES):
-                        accel_speed_ms = calculate_speed_from_accel()
-                        speed_samples.append(accel_speed_ms)
-                        time.sleep(1.0 / TARGET_HZ)  # Sample at target rate
-                    
-                    # Calculate average speed and convert to km/h
-                    avg_speed_ms = sum(speed_samples) / len(speed_samples)
-                    final_speed = avg_speed_ms * 3.6
+                    # GPS reports zero or near-zero speed (stationary or GPS
+                    # error) - average the integrator ring instead
+                    final_speed = _fallback_speed_kmh(FALLBACK_SAMPLES)
                     speed_src = "ACCEL"
                 else:
-                    # GPS speed unavailable or invalid - calculate average from multiple samples
-                    speed_samples = []
-                    for _ in range(FALLBACK_SAMPLES):
-                        accel_speed_ms = calculate_speed_from_accel()
-                        speed_samples.append(accel_speed_ms)
-                        time.sleep(1.0 / TARGET_HZ)  # Sample at target rate
-                    
-                    # Calculate average speed and convert to km/h
-                    avg_speed_ms = sum(speed_samples) / len(speed_samples)
-                    final_speed = avg_speed_ms * 3.6
+                    # GPS speed unavailable or invalid
+                    final_speed = _fallback_speed_kmh(FALLBACK_SAMPLES)
                     speed_src = "ACCEL"
                 
                 # Update global with final speed (either GPS or fallback)
-                with data_lock:
-                    latest_gps = (lat, lon, final_speed)
-                    gps_last_update_time = time.time()
-                    latest_speed_source = speed_src
+                latest_gps = (lat, lon, final_speed, speed_src, now_mono)
             else:
-                # GPS read failed completely - calculate average from multiple samples
-                speed_samples = []
-                for _ in range(FALLBACK_SAMPLES):
-                    accel_speed_ms = calculate_speed_from_accel()
-                    speed_samples.append(accel_speed_ms)
-                    time.sleep(1.0 / TARGET_HZ)  # Sample at target rate
-                
-                # Calculate average speed and convert to km/h
-                avg_speed_ms = sum(speed_samples) / len(speed_samples)
-                final_speed = avg_speed_ms * 3.6
-                
-                with data_lock:
-                    latest_gps = (None, None, final_speed)
-                    gps_last_update_time = time.time()
-                    latest_speed_source = "ACCEL"
+                # No complete sentence this pass (mid-burst wakeup).
+                # Keep the last fix until it actually goes stale; only
+                # then drop to the accelerometer fallback, else lat/lon
+                # would be clobbered dozens of times per burst.
+                g = latest_gps
+                if g[0] is None or now_mono - g[4] > GPS_TIMEOUT_SECONDS:
+                    final_speed = _fallback_speed_kmh(FALLBACK_SAMPLES)
+                    latest_gps = (None, None, final_speed, "ACCEL", now_mono)
                     
         except Exception as e:
             print(f"GPS thread error: {e}")
-            # On exception - calculate average from multiple samples
-            speed_samples = []
-            for _ in range(FALLBACK_SAMPLES):
-                accel_speed_ms = calculate_speed_from_accel()
-                speed_samples.append(accel_speed_ms)
-                time.sleep(1.0 / TARGET_HZ)  # Sample at target rate
-            
-            # Calculate average speed and convert to km/h
-            avg_speed_ms = sum(speed_samples) / len(speed_samples)
-            final_speed = avg_speed_ms * 3.6
-            
-            with data_lock:
-                latest_gps = (None, None, final_speed)
-                gps_last_update_time = time.time()
-                latest_speed_source = "ACCEL"
-        
-        time.sleep(1.0)
+            g = latest_gps
+            if g[0] is None or now_mono - g[4] > GPS_TIMEOUT_SECONDS:
+                final_speed = _fallback_speed_kmh(FALLBACK_SAMPLES)
+                latest_gps = (None, None, final_speed, "ACCEL", now_mono)
+
+        if sel is not None:
+            # Serial recovery close()/open()s the port, so the registered
+            # fd can go stale (or be reused by another thread's socket);
+            # re-register whenever it moved and never let a bad fd kill
+            # the thread.
+            try:
+                fd = gps_serial.fileno()
+                if fd != sel_fd:
+                    try:
+                        sel.unregister(sel_fd)
+                    except (KeyError, ValueError, OSError):
+                        pass
+                    sel.register(fd, selectors.EVENT_READ)
+                    sel_fd = fd
+                sel.select(timeout=1.0)  # Readable or 1 s fallback tick
+            except (OSError, ValueError):
+                time.sleep(1.0)  # Port mid-recovery; retry next pass
+        else:
+            time.sleep(1.0)
 
     print("GPS thread stopped.")
 
+# Speed limits are road attributes: cache them per ~100 m grid cell with
+# a TTL, so staying in the same block costs no API call but stale entries
+# eventually refresh (an lru_cache would pin a wrong/None answer forever).
+_SPEED_LIMIT_TTL_S = 600.0
+_SPEED_LIMIT_CACHE_MAX = 4096
+_speed_limit_cache = OrderedDict()
+
+def _cached_speed_limit(lat, lon):
+    """Speed limit for the ~100 m grid cell containing (lat, lon)."""
+    key = (round(lat * 1000), round(lon * 1000))
+    now = time.time()
+    hit = _speed_limit_cache.get(key)
+    if hit is not None and now - hit[0] < _SPEED_LIMIT_TTL_S:
+        _speed_limit_cache.move_to_end(key)
+        return hit[1]
+    sl = speed_limit_utils.get_speed_limit(lat, lon, OLA_MAPS_API_KEY)
+    _speed_limit_cache[key] = (now, sl)
+    _speed_limit_cache.move_to_end(key)
+    while len(_speed_limit_cache) > _SPEED_LIMIT_CACHE_MAX:
+        _speed_limit_cache.popitem(last=False)
+    return sl
+
 def speed_limit_thread():
     """Background thread to periodically fetch speed limit using latest GPS coords.
     Respects SPEED_LIMIT_REFRESH_S interval. Safe to run even without GPS (it will idle)."""
     global latest_speed_limit, last_speed_limit_fetch
     while not stop_event.is_set():
         try:
-            with data_lock:
-                gps = latest_gps
-            lat, lon, _ = gps
+            # Atomic reference read/writes; last_speed_limit_fetch is only
+            # touched by this thread. Load the tuple once so lat and lon
+            # come from the same fix.
+            g = latest_gps
+            lat, lon = g[0], g[1]
             if lat is not None and lon is not None:
                 now = time.time()
                 if (latest_speed_limit is None) or (now - last_speed_limit_fetch >= SPEED_LIMIT_REFRESH_S):
-                    sl = speed_limit_utils.get_speed_limit(lat, lon, OLA_MAPS_API_KEY)
-                    with data_lock:
-                        latest_speed_limit = sl
-                        last_speed_limit_fetch = now
+                    sl = _cached_speed_limit(lat, lon)
+                    latest_speed_limit = sl
+                    last_speed_limit_fetch = now
         except Exception as e:
             # Silent or minimal logging to avoid spamming
             print(f"Speed limit thread error: {e}")
         # Sleep a short amount; main gating is interval check above
         time.sleep(0.2)
 
+def _scan_image_dir():
+    """One scandir pass -> (sorted timestamp array, parallel path list)."""
+    pairs = []
+    try:
+        with os.scandir(IMAGE_DIR) as it:
+            for entry in it:
+                name = entry.name
+                if not (name.startswith("frame_") and name.endswith(".jpg")):
+                    continue
+                try:
+                    ts = int(name[6:-4])
+                except ValueError:
+                    continue
+                pairs.append((ts, os.path.join(IMAGE_DIR, name)))
+    except OSError:
+        return array.array('q'), []
+    pairs.sort()
+    return array.array('q', (p[0] for p in pairs)), [p[1] for p in pairs]
+
+# Oldest entries rotate out past this; matching ever-older timestamps is useless
+_IMAGE_CACHE_MAX = 50000
+
 def update_image_cache():
-    """Periodically update the cached image file list."""
-    global image_files_cache, last_image_cache_update
-    while not stop_event.is_set():
-        try:
-            files = glob.glob(os.path.join(IMAGE_DIR, "frame_*.jpg"))
-            with image_cache_lock:
-                image_files_cache = files
-                last_image_cache_update = time.time()
-        except Exception as e:
-            # print(f"Image cache update error: {e}")
-            pass
-        time.sleep(IMAGE_REFRESH_INTERVAL_S)
+    """Keep the image cache fresh.
 
-def get_latest_image_for_timestamp(target_timestamp_ms):
-    """Fast image lookup using cached file list."""
+    Preferred path: an inotify watch on IMAGE_DIR, so new frames are
+    insorted incrementally and steady-state cost is near zero. Fallback:
+    the old full rescan once per IMAGE_REFRESH_INTERVAL_S.
+    """
+    global image_ts_cache, image_path_cache, last_image_cache_update
+
+    watcher = None
+    if INotify is not None:
+        try:
+            watcher = INotify()
+            watcher.add_watch(IMAGE_DIR,
+                              _inotify_flags.CREATE | _inotify_flags.MOVED_TO | _inotify_flags.CLOSE_WRITE)
+        except OSError:
+            watcher = None
+
+    # Seed with one full scan either way
+    ts_arr, paths = _scan_image_dir()
     with image_cache_lock:
-        image_files = image_files_cache.copy()
-    
-    if not image_files:
-        return None
+        image_ts_cache = ts_arr
+        image_path_cache = paths
+        last_image_cache_update = time.time()
 
-    # Extract timestamp from filenames and find closest before or at target_timestamp_ms
-    best_image = None
-    smallest_diff = float('inf')
+    if watcher is None:
+        while not stop_event.is_set():
+            time.sleep(IMAGE_REFRESH_INTERVAL_S)
+            try:
+                ts_arr, paths = _scan_image_dir()
+                with image_cache_lock:
+                    image_ts_cache = ts_arr
+                    image_path_cache = paths
+                    last_image_cache_update = time.time()
+            except Exception:
+                pass
+        return
 
-    for filepath in image_files:
-        filename = os.path.basename(filepath)
+    while not stop_event.is_set():
         try:
-            ts_part = filename.split('_')[1].split('.')[0]
-            image_ts = int(ts_part)
-            time_diff = target_timestamp_ms - image_ts
-            if 0 <= time_diff < smallest_diff:
-                smallest_diff = time_diff
-                best_image = filepath
-        except (IndexError, ValueError):
-            continue
+            for event in watcher.read(timeout=1000):
+                name = event.name
+                if not (name.startswith("frame_") and name.endswith(".jpg")):
+                    continue
+                try:
+                    ts = int(name[6:-4])
+                except ValueError:
+                    continue
+                with image_cache_lock:
+                    idx = bisect.bisect_right(image_ts_cache, ts)
+                    if idx and image_ts_cache[idx - 1] == ts:
+                        continue  # CLOSE_WRITE after CREATE re-reports the file
+                    image_ts_cache.insert(idx, ts)
+                    image_path_cache.insert(idx, os.path.join(IMAGE_DIR, name))
+                    if len(image_ts_cache) > _IMAGE_CACHE_MAX:
+                        del image_ts_cache[0]
+                        del image_path_cache[0]
+                    last_image_cache_update = time.time()
+        except Exception:
+            time.sleep(IMAGE_REFRESH_INTERVAL_S)
 
-    return best_image
+def get_latest_image_for_timestamp(target_timestamp_ms):
+    """O(log N) lookup of the newest frame at or before the target time."""
+    # Bisect under the lock: the watcher mutates the arrays in place
+    with image_cache_lock:
+        idx = bisect.bisect_right(image_ts_cache, target_timestamp_ms) - 1
+        return image_path_cache[idx] if idx >= 0 else None
+
+# strftime cache: at 104 Hz the date-and-seconds prefix repeats ~104
+# times before changing, so only the millisecond tail is formatted per row
+_cached_sec = -1
+_cached_sec_str = ''
+
+def _format_ts(timestamp_ms):
+    """Wall timestamp string, recomputing the seconds prefix only on rollover."""
+    global _cached_sec, _cached_sec_str
+    sec, ms = divmod(timestamp_ms, 1000)
+    if sec != _cached_sec:
+        _cached_sec_str = datetime.fromtimestamp(sec).strftime('%Y-%m-%d %H:%M:%S')
+        _cached_sec = sec
+    return f"{_cached_sec_str}.{ms:03d}"
+
+def _format_row(timestamp_ms, img_path, mpu, lat, lon, spd, speed_limit):
+    """Format one sample as a CSV line (fields never need quoting)."""
+    fields = (_format_ts(timestamp_ms), img_path or '', *mpu, lat, lon, spd, speed_limit)
+    return ','.join('' if v is None else str(v) for v in fields) + '\n'
 
 def csv_writer_thread(csv_filename, fieldnames):
-    """Background thread to write CSV rows from queue with batching and formatting."""
+    """Background thread draining queued samples into batched binary writes."""
     file_exists = os.path.isfile(csv_filename)
-    
-    with open(csv_filename, 'a', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+
+    # Unbuffered binary append: each drained batch goes to the kernel as
+    # one vectored write (os.writev), so a batch costs a single syscall
+    # and lands in the page cache immediately - no BufferedWriter layer
+    # and no separate flush timer needed.
+    with open(csv_filename, 'ab', buffering=0) as f:
+        fd = f.fileno()
+        try:
+            # Append-only stream: let the kernel favor sequential writeback
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
         if not file_exists:
-            writer.writeheader()
-        
-        batch = []
-        while not stop_event.is_set():
+            os.write(fd, (','.join(fieldnames) + '\n').encode('ascii'))
+
+        done = False
+        while not done and not stop_event.is_set():
+            lines = []
             try:
-                # row is now a tuple: (timestamp_ms, img_path, mpu_tuple, lat, lon, spd, speed_limit, speed_source)
-                row_data = csv_write_queue.get(timeout=0.1)
-                
-                # Unpack tuple
-                timestamp_ms, img_path, mpu, lat, lon, spd, speed_limit, speed_source = row_data
-                
-                # Format timestamp here (not in main loop)
-                readable_timestamp = datetime.fromtimestamp(timestamp_ms / 1000.0).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                
-                # Build dict for CSV
-                row = {
-                    'timestamp': readable_timestamp,
-                    'image_path': img_path or '',
-                    'acc_x': mpu[0], 'acc_y': mpu[1], 'acc_z': mpu[2],
-                    'gyro_x': mpu[3], 'gyro_y': mpu[4], 'gyro_z': mpu[5],
-                    'latitude': lat, 'longitude': lon,
-                    'speed': spd,
-                    'speed_limit': speed_limit
-                }
-                
-                batch.append(row)
-                
-                # Write in batches for better I/O performance
-                if len(batch) >= CSV_BATCH_SIZE:
-                    writer.writerows(batch)
-                    f.flush()
-                    batch.clear()
-                    
-            except Empty:
-                # Flush any remaining batch when queue is empty
-                if batch:
-                    writer.writerows(batch)
-                    f.flush()
-                    batch.clear()
-                continue
+                while len(lines) < CSV_BATCH_SIZE:
+                    line = csv_write_queue.popleft()
+                    if line is None:
+                        done = True  # End-of-ride sentinel; final flush below
+                        break
+                    lines.append(line)
+            except IndexError:
+                pass  # Queue drained
             except Exception as e:
                 print(f"CSV writer error: {e}")
-        
-        # Final flush on exit
-        if batch:
-            writer.writerows(batch)
-            f.flush()
+
+            if lines:
+                try:
+                    os.writev(fd, [line.encode('ascii') for line in lines])
+                except AttributeError:  # Platforms without writev
+                    os.write(fd, ''.join(lines).encode('ascii'))
+            elif not done:
+                if _csv_efd is not None:
+                    os.eventfd_read(_csv_efd)  # Block until a producer signals
+                else:
+                    time.sleep(0.005)  # Idle wait; deques have no blocking get
 
 def print_worker_thread():
     """Background thread to handle console output."""
     while not stop_event.is_set():
         try:
-            msg = print_queue.get(timeout=0.1)
-            print(msg)
-        except Empty:
-            continue
+            print(print_queue.popleft())
+        except IndexError:
+            if _print_efd is not None:
+                os.eventfd_read(_print_efd)  # Block until something is queued
+            else:
+                time.sleep(0.05)
 
 def control_poll_thread():
-    """Background thread to periodically poll control flags."""
+    """Background thread tracking the active ride's control flags.
+
+    Subscribes to the ride control node over SSE, so a flag flip lands
+    within ~100 ms and an idle connection costs no polling traffic. The
+    stream's keep-alive heartbeats bound how long the thread can sit on
+    a stale subscription after the ride changes; one plain GET per
+    CONTROL_POLL_INTERVAL_S remains as the no-streaming fallback.
+    """
     global current_is_active, last_control_poll
-    
+
     while not stop_event.is_set():
-        time.sleep(CONTROL_POLL_INTERVAL_S)
-        
-        # Get current ride_id from queue (non-blocking)
-        ride_id = None
-        try:
-            ride_id = control_poll_queue.get_nowait()
-            # Put it back for next iteration
-            control_poll_queue.put_nowait(ride_id)
-        except Empty:
+        # Single-writer/single-reader string rebind is atomic; no queue
+        # round-trip needed just to peek at the active ride id
+        ride_id = current_ride_id
+        if not ride_id:
+            time.sleep(CONTROL_POLL_INTERVAL_S)
             continue
-        
-        if ride_id:
+        try:
+            for flags in firebase_uploader.stream_control_flags(USER_ID, ride_id):
+                if stop_event.is_set():
+                    return
+                if current_ride_id != ride_id:
+                    break  # New ride; re-subscribe to its control node
+                if flags is None:
+                    continue  # keep-alive heartbeat
+                current_is_active = bool(flags.get("is_active", False))
+                last_control_poll = time.time()
+        except Exception:
+            # Streaming unsupported or dropped - one polling pass, then retry
             try:
                 is_active, _calc = firebase_uploader.get_control_flags_for_ride(USER_ID, ride_id)
                 current_is_active = is_active
                 last_control_poll = time.time()
-            except Exception as e:
+            except Exception:
                 pass  # Retain previous state on failure
+            time.sleep(CONTROL_POLL_INTERVAL_S)
 
 def wait_until_active(ride_id: str | None = None, poll_interval: float = 0.5):
     """Obtain (if needed) the next ride_id and block until remote activates it.
@@ -417,23 +619,44 @@ def wait_until_active(ride_id: str | None = None, poll_interval: float = 0.5):
 
         if current_is_active:
             return ride_id
-        
+
+        # Preferred path: block on a server-sent-event stream of the ride
+        # control node - zero RPC traffic while idle, and activation is
+        # picked up the moment the flag flips instead of on the next poll
         try:
-            is_active, _calc = firebase_uploader.get_control_flags_for_ride(USER_ID, ride_id)
-            if is_active:
-                current_is_active = True
-                print("--------------------------------------------")
-                print("Ride activated. Beginning logging.")
-                print("--------------------------------------------")
-                break
+            for flags in firebase_uploader.stream_control_flags(USER_ID, ride_id):
+                if stop_event.is_set():
+                    return ride_id
+                if flags is None:
+                    continue  # keep-alive heartbeat
+                if flags.get("is_active"):
+                    current_is_active = True
+                    break
         except Exception:
-            pass
-        time.sleep(poll_interval)
+            # Streaming unsupported or disconnected - one polling pass,
+            # then the outer loop retries (and re-opens the stream)
+            try:
+                is_active, _calc = firebase_uploader.get_control_flags_for_ride(USER_ID, ride_id)
+                if is_active:
+                    current_is_active = True
+            except Exception:
+                pass
+            time.sleep(poll_interval)
         last_control_poll = time.time()
+        if current_is_active:
+            print("--------------------------------------------")
+            print("Ride activated. Beginning logging.")
+            print("--------------------------------------------")
+            break
     return ride_id
 
 def main():
-    global latest_speed_limit, last_speed_limit_fetch, current_is_active, last_control_poll, shm_writer
+    global latest_speed_limit, last_speed_limit_fetch, current_is_active, last_control_poll, shm_writer, csv_drop_count, current_ride_id
+
+    # Shorter GIL switch interval (default 5 ms): a compute-bound worker
+    # can otherwise hold the GIL for half a sample period before the
+    # sampling loop gets scheduled again
+    sys.setswitchinterval(0.001)
 
     # Initialize shared memory writer for warning system
     try:
@@ -486,6 +709,22 @@ def main():
         t.start()
     print(f"Started {len(threads)} threads (sensors + workers).")
 
+    # Pin the sampling loop to its own core and try for real-time
+    # priority so ticks are not delayed by scheduler migration or
+    # background load (workers and GPS stay on CPUs 0-1)
+    set_thread_affinity(3, rt_priority=50)
+
+    # Kernel pacer for the sampling loop; falls back to sleep() pacing
+    pacer_fd = make_periodic_fd(TARGET_HZ)
+    if pacer_fd is None:
+        print("timerfd unavailable; falling back to sleep() pacing")
+
+    # Cyclic GC off while sampling: a generation-2 pass can stall the loop
+    # for several samples, and the hot path allocates only short strings
+    # and tuples that refcounting reclaims on its own. A full collect runs
+    # in the idle gap between rides instead.
+    gc.disable()
+
     # Main ride loop - handles multiple rides
     fieldnames = [
         'timestamp', 'image_path', 'acc_x', 'acc_y', 'acc_z', 'gyro_x', 'gyro_y', 'gyro_z',
@@ -493,6 +732,9 @@ def main():
     ]
     
     while not stop_event.is_set():
+        # Collect cycles from the previous ride while nothing is sampling
+        gc.collect()
+
         # Wait for remote to set is_active True before starting (also acquires ride_id)
         ride_id = wait_until_active()
 
@@ -503,22 +745,26 @@ def main():
         csv_thread = threading.Thread(target=csv_writer_thread, args=(csv_filename, fieldnames), daemon=True)
         csv_thread.start()
         
-        # Put ride_id in control poll queue
-        try:
-            control_poll_queue.put_nowait(ride_id)
-        except:
-            pass
+        # Publish the active ride id for the control poll thread
+        current_ride_id = ride_id
 
         print("--------------------------------------------")
         print(f"Logging at {TARGET_HZ} Hz to {csv_filename}.")
         print("--------------------------------------------")
-        next_sample_time = time.perf_counter()
-        last_fb_push = 0.0
+        next_sample_ns = time.monotonic_ns()
+        missed_ticks = 0
+        first_tick = True  # First fd read may carry backlog from idle time
+        # Wall-clock anchor paired with a monotonic anchor: per-row stamps
+        # then derive from a single clock_gettime(CLOCK_MONOTONIC) plus
+        # integer math, immune to NTP/wall-clock jumps mid-ride.
+        t0_wall_ms = int(time.time() * 1000)
+        t0_ns = time.monotonic_ns()
         sample_count = 0
         
-        # Reset batch buffer for this ride
+        # Reset batch buffer and drop accounting for this ride
         with batch_buffer_lock:
             batch_buffer.clear()
+        csv_drop_count = 0
         
         # Set ride active flag in shared memory
         if shm_writer is not None:
@@ -535,38 +781,61 @@ def main():
             last_speed_calc_ts = None
         
         # Pre-allocate variables to avoid lookups
-        sample_interval = SAMPLE_INTERVAL
+        sample_interval_ns = int(SAMPLE_INTERVAL * 1e9)
         fb_interval = FIREBASE_PUSH_INTERVAL_S
         print_interval = PRINT_INTERVAL
 
+        # Pre-bind hot-loop callables to locals (same trick as the lidar
+        # reader): LOAD_FAST instead of a global + attribute walk on every
+        # one of the ~104 iterations per second
+        _monotonic_ns = time.monotonic_ns
+        _os_read = os.read
+        _from_bytes = int.from_bytes
+        _format = _format_row
+        _q_append = csv_write_queue.append
+        _stop_is_set = stop_event.is_set
+
         try:
-            while not stop_event.is_set():                
-                # Sleep until next sample time (tight timing loop)
-                now = time.perf_counter()
-                sleep_time = next_sample_time - now
-                if sleep_time > 0.0001:  # Only sleep if > 0.1ms
-                    time.sleep(sleep_time)
-                
-                # Update next sample time
-                next_sample_time += sample_interval
-
-                # CRITICAL SECTION: Single atomic read - minimize lock time
-                with data_lock:
-                    mpu = latest_mpu  # Tuple copy (fast)
-                    lat, lon, spd = latest_gps  # Unpack directly (speed already handled by GPS thread)
-                    speed_limit = latest_speed_limit
-                    speed_source = latest_speed_source  # Read speed source set by GPS thread
-
-                # Get timestamp
-                timestamp_ms = int(time.time() * 1000)
-                t_wall = time.time()  # For Firebase timing
+            while not _stop_is_set():
+                if pacer_fd is not None:
+                    # Block until the kernel timer ticks; the u64 read back
+                    # is the number of periods elapsed since the last read
+                    ticks = _from_bytes(_os_read(pacer_fd, 8), 'little')
+                    if first_tick:
+                        first_tick = False
+                    elif ticks > 1:
+                        missed_ticks += ticks - 1
+                    now_ns = _monotonic_ns()
+                else:
+                    # Sleep until next sample time (tight timing loop).
+                    # One clock read per iteration: after sleeping to the
+                    # deadline we are at (or microseconds past) it, so the
+                    # deadline itself serves as the post-wake time.
+                    now_ns = _monotonic_ns()
+                    sleep_ns = next_sample_ns - now_ns
+                    if sleep_ns > 100_000:  # Only sleep if > 0.1ms
+                        time.sleep(sleep_ns / 1e9)
+                        now_ns = next_sample_ns
+
+                    # Update next sample time
+                    next_sample_ns += sample_interval_ns
+
+                # Lock-free snapshot: each read is one atomic tuple/ref load
+                mpu = latest_mpu
+                lat, lon, spd, speed_source, _ = latest_gps
+                speed_limit = latest_speed_limit
+
+                # Get timestamp (anchored, monotonic-derived wall ms)
+                timestamp_ms = t0_wall_ms + (now_ns - t0_ns) // 1_000_000
                 
                 # Image path lookup - do in background or skip for performance
                 # For 100 Hz, we skip this in main loop and handle in CSV writer if needed
                 img_path = None  # Set to None for max speed; CSV writer can lookup if needed
 
                 # Pack data as tuple (much faster than dict construction)
-                row_tuple = (timestamp_ms, img_path, mpu, lat, lon, spd, speed_limit, speed_source)
+                # Pre-format the CSV line here; the writer thread only
+                # batches strings and issues the writes
+                row_line = _format(timestamp_ms, img_path, mpu, lat, lon, spd, speed_limit)
 
                 # Check if ride is still active (control poll thread updates this)
                 if not current_is_active:
@@ -582,10 +851,17 @@ def main():
                         print("Ride deactivated in shared memory")
                         print("--------------------------------------------")
                     
-                    # Wait for CSV queue to empty (with timeout)
-                    timeout = time.time() + 5.0
-                    while not csv_write_queue.empty() and time.time() < timeout:
-                        time.sleep(0.1)
+                    # Sentinel after the queued rows makes the writer flush
+                    # and exit once it has drained them; the bounded join
+                    # replaces polling the queue for emptiness.
+                    csv_write_queue.append(None)
+                    if _csv_efd is not None:
+                        os.eventfd_write(_csv_efd, 1)
+                    csv_thread.join(timeout=5.0)
+                    if csv_drop_count:
+                        print(f"CSV queue overflow: {csv_drop_count} samples dropped")
+                    if missed_ticks:
+                        print(f"Pacing overruns: {missed_ticks} missed ticks at {TARGET_HZ} Hz")
                     
                     # Wait a bit for Warning_Generate.py to finish writing its CSV
                     time.sleep(2.0)
@@ -608,10 +884,13 @@ def main():
                     break
 
                 # Queue CSV write (non-blocking, fast)
-                try:
-                    csv_write_queue.put_nowait(row_tuple)
-                except:
-                    pass  # Queue full, skip this sample
+                if len(csv_write_queue) == CSV_QUEUE_MAX:
+                    csv_drop_count += 1  # Full: oldest sample falls off
+                _q_append(row_line)
+                # Wake the writer only on the empty->non-empty transition;
+                # while it is draining, appends piggyback on the last wakeup
+                if _csv_efd is not None and len(csv_write_queue) == 1:
+                    os.eventfd_write(_csv_efd, 1)
 
                 # Add to batch buffer for shared memory (warning system)
                 if shm_writer is not None:
@@ -640,6 +919,13 @@ def main():
 
                 # Increment sample counter
                 sample_count += 1
+
+                # Surface queue-shed accounting once a minute rather than
+                # only at ride end
+                if csv_drop_count and sample_count % (TARGET_HZ * 60) == 0:
+                    print_queue.append(f"CSV queue overflow: {csv_drop_count} samples shed so far")
+                    if _print_efd is not None:
+                        os.eventfd_write(_print_efd, 1)
                 
                 # Queue console output much less frequently (1 Hz at 100 Hz sampling)
                 # if sample_count % print_interval == 0:
@@ -657,10 +943,10 @@ def main():
             print("\nStopping logging...")
             break  # Break out of the ride loop
     
-    # Cleanup on exit
+    # Cleanup on exit. All workers are daemon threads parked in I/O, so
+    # joining them only adds up to 0.5 s each of shutdown latency; signal
+    # stop (lets the CSV writer flush its batch) and let exit reap them.
     stop_event.set()
-    for t in threads:
-        t.join(timeout=0.5)
     if gps_serial:
         try:
             gps_serial.close()